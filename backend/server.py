@@ -1,33 +1,77 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from supabase import create_client, Client
+from starlette.middleware.gzip import GZipMiddleware
+from supabase import AsyncClient, AsyncClientOptions
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
+from postgrest.types import ReturnMethod
+import httpx
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta, date
 from passlib.context import CryptContext
+import bcrypt
+from cachetools import TTLCache
+import hashlib
+import time
 import jwt
 from enum import Enum
 import io
+import csv
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph, Spacer
 from reportlab.lib.units import inch
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# Supabase connection
+# Supabase connection (async client, created on startup)
 supabase_url = os.environ['SUPABASE_URL']
 supabase_key = os.environ['SUPABASE_SERVICE_KEY']
-supabase: Client = create_client(supabase_url, supabase_key)
+supabase: Optional[AsyncClient] = None
+
+# Keep-alive pool for the PostgREST HTTP/2 session shared by every request; idle
+# connections are kept for a minute (httpx drops them after 5s by default)
+POSTGREST_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60)
+# Fail a stuck PostgREST call well before the library's 120s default
+POSTGREST_TIMEOUT_SECONDS = 10
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """PostgREST client whose session keeps a bounded pool of warm connections"""
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=True,
+            limits=POSTGREST_HTTP_LIMITS
+        )
+
+class SupabaseClient(AsyncClient):
+    """Supabase client that talks to PostgREST through PooledPostgrestClient"""
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT, verify=True, proxy=None):
+        return PooledPostgrestClient(
+            rest_url,
+            headers=headers,
+            schema=schema,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy
+        )
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -36,12 +80,27 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production-123')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+# Our tokens carry no audience/issuer; only exp and sub are required
+JWT_DECODE_OPTIONS = {"verify_aud": False, "verify_iss": False, "require": ["exp", "sub"]}
+
+# Authenticated user cache: sha256(token) -> (token exp timestamp, User)
+AUTH_CACHE_TTL_SECONDS = 30
+_auth_cache = TTLCache(maxsize=10000, ttl=AUTH_CACHE_TTL_SECONDS)
+
+# Reference data caches holding (etag, serialized JSON body), cleared on writes
+REFERENCE_CACHE_TTL_SECONDS = 30
+_projects_cache = TTLCache(maxsize=1, ttl=REFERENCE_CACHE_TTL_SECONDS)
+_tasks_cache = TTLCache(maxsize=256, ttl=REFERENCE_CACHE_TTL_SECONDS)  # keyed by project_id (None = all)
+_employees_cache = TTLCache(maxsize=1, ttl=REFERENCE_CACHE_TTL_SECONDS)
+
+# Admin dashboard counters; cleared by the writes that change them
+_stats_cache = TTLCache(maxsize=16, ttl=REFERENCE_CACHE_TTL_SECONDS)
 
 # Security
 security = HTTPBearer()
 
-# Create the main app
-app = FastAPI()
+# Create the main app (orjson serializes the large list/report payloads much faster)
+app = FastAPI(default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 # Enums
@@ -63,6 +122,12 @@ class TimesheetStatus(str, Enum):
     APPROVED = "approved"
     DENIED = "denied"
 
+# Raw values used in queries and payloads, resolved once instead of per request
+ROLE_ADMIN = UserRole.ADMIN.value
+STATUS_SUBMITTED = TimesheetStatus.SUBMITTED.value
+# Timesheet states that block resubmitting the same week
+LOCKED_TIMESHEET_STATUSES = frozenset({TimesheetStatus.SUBMITTED.value, TimesheetStatus.APPROVED.value})
+
 # Models
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -75,6 +140,9 @@ class User(BaseModel):
     default_task: Optional[str] = None
     created_at: datetime
 
+# Columns backing the User model (never the password hash)
+USER_COLUMNS = 'id, email, name, role, status, default_project, default_task, created_at'
+
 class UserCreate(BaseModel):
     email: EmailStr
     name: str
@@ -100,6 +168,11 @@ class LoginResponse(BaseModel):
     token: str
     user: User
 
+class TokenUser(BaseModel):
+    """Identity carried by the access token's claims, without a database lookup"""
+    id: str
+    role: UserRole
+
 class Project(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str
@@ -141,6 +214,12 @@ class TimeEntry(BaseModel):
     notes: Optional[str] = None
     created_at: datetime
 
+# Listing endpoints return at most this many rows per page
+MAX_PAGE_SIZE = 1000
+
+# Columns returned by time entry listings (the TimeEntry fields)
+TIME_ENTRY_COLUMNS = 'id, user_id, project_id, task_id, start_time, end_time, duration, entry_type, date, notes, created_at'
+
 class TimeEntryCreate(BaseModel):
     project_id: str
     task_id: str
@@ -206,13 +285,57 @@ class Notification(BaseModel):
     related_timesheet_id: Optional[str] = None
     created_at: datetime
 
+NOTIFICATION_COLUMNS = 'id, user_id, type, title, message, read, related_timesheet_id, created_at'
+
+# List adapters for responses serialized outside FastAPI's response_model path
+ProjectList = TypeAdapter(List[Project])
+TaskList = TypeAdapter(List[Task])
+UserList = TypeAdapter(List[User])
+TimeEntryList = TypeAdapter(List[TimeEntry])
+TimesheetList = TypeAdapter(List[Timesheet])
+NotificationList = TypeAdapter(List[Notification])
+
 
 # Utility functions
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# bcrypt is deliberately slow, so hashing runs in a worker thread to keep the event loop free
+async def hash_password(password: str) -> str:
+    return await asyncio.to_thread(pwd_context.hash, password)
+
+def check_bcrypt(plain_password: str, hashed_password: str) -> bool:
+    # Stored hashes are all bcrypt, so skip passlib's scheme dispatch on the login path
+    try:
+        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    except ValueError:
+        return False
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.to_thread(check_bcrypt, plain_password, hashed_password)
+
+def serialize_list(adapter: TypeAdapter, rows: List[Dict[str, Any]]) -> bytes:
+    """Validate rows against a list response model and serialize them to JSON once"""
+    return adapter.dump_json(adapter.validate_python(rows))
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def created_at_cursor_filter(cursor: str) -> str:
+    """PostgREST or= filter for rows after a "created_at|id" keyset cursor, newest first"""
+    try:
+        cursor_created, cursor_id = cursor.split('|', 1)
+        cursor_created = datetime.fromisoformat(cursor_created).isoformat()
+        cursor_id = str(uuid.UUID(cursor_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return f'created_at.lt."{cursor_created}",and(created_at.eq."{cursor_created}",id.lt.{cursor_id})'
+
+def etag_for(body: bytes) -> str:
+    """Weak ETag derived from a response body; weak because GZipMiddleware may re-encode the bytes"""
+    return 'W/"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def cached_json_response(request: Request, etag: str, body: bytes) -> Response:
+    """JSON response carrying an ETag; 304 without a body if the client already has this version"""
+    # If-None-Match uses weak comparison: W/ prefixes are ignored on both sides
+    client_tags = [tag.strip().removeprefix('W/') for tag in request.headers.get('if-none-match', '').split(',')]
+    if etag.removeprefix('W/') in client_tags or '*' in client_tags:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -221,33 +344,60 @@ def create_access_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+async def create_notifications(user_ids: List[str], notification_type: NotificationType, title: str, message: str, related_timesheet_id: Optional[str] = None):
+    """Helper function to create the same notification for several users in one insert"""
+    if not user_ids:
+        return []
+    notifications_data = [
+        {
+            "user_id": user_id,
+            "type": notification_type.value,
+            "title": title,
+            "message": message,
+            "related_timesheet_id": related_timesheet_id,
+            "read": False
+        }
+        for user_id in user_ids
+    ]
+    result = await supabase.table('notifications').insert(notifications_data).execute()
+    return result.data
+
 async def create_notification(user_id: str, notification_type: NotificationType, title: str, message: str, related_timesheet_id: Optional[str] = None):
     """Helper function to create a notification"""
-    notification_data = {
-        "user_id": user_id,
-        "type": notification_type.value,
-        "title": title,
-        "message": message,
-        "related_timesheet_id": related_timesheet_id,
-        "read": False
-    }
-    result = supabase.table('notifications').insert(notification_data).execute()
-    return result.data[0] if result.data else None
+    created = await create_notifications([user_id], notification_type, title, message, related_timesheet_id)
+    return created[0] if created else None
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+def invalidate_user_cache(user_id: str):
+    """Drop cached auth entries for a user so changes apply on their next request"""
+    for key, (_, user) in list(_auth_cache.items()):
+        if user.id == user_id:
+            _auth_cache.pop(key, None)
+
+
+def decode_access_token(token: str) -> dict:
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options=JWT_DECODE_OPTIONS)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    result = supabase.table('users').select('*').eq('id', user_id).execute()
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+    token = credentials.credentials
+    cache_key = hashlib.sha256(token.encode()).digest()
+    cached = _auth_cache.get(cache_key)
+    if cached is not None:
+        exp_ts, user = cached
+        if time.time() < exp_ts:
+            return user
+        _auth_cache.pop(cache_key, None)
+    
+    payload = decode_access_token(token)
+    user_id: str = payload["sub"]
+    
+    result = await supabase.table('users').select(USER_COLUMNS).eq('id', user_id).execute()
     if not result.data:
         raise HTTPException(status_code=401, detail="User not found")
     
@@ -256,8 +406,18 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if user.status == UserStatus.INACTIVE:
         raise HTTPException(status_code=403, detail="Account is inactive")
     
+    _auth_cache[cache_key] = (payload.get("exp", 0), user)
     return user
 
+async def get_current_user_light(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenUser:
+    """Identity from the JWT alone, for high-frequency polling endpoints that only
+    touch the caller's own rows. Skips the users lookup, so the inactive-account
+    check does not apply; use get_current_user for anything else."""
+    payload = decode_access_token(credentials.credentials)
+    if payload.get("role") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return TokenUser(id=payload["sub"], role=payload["role"])
+
 async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -266,12 +426,12 @@ async def get_admin_user(current_user: User = Depends(get_current_user)) -> User
 # Auth routes
 @api_router.post("/auth/login", response_model=LoginResponse)
 async def login(request: LoginRequest):
-    result = supabase.table('users').select('*').eq('email', request.email).execute()
+    result = await supabase.table('users').select('*').eq('email', request.email).execute()
     if not result.data:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     user_data = result.data[0]
-    if not verify_password(request.password, user_data.get('password', '')):
+    if not await verify_password(request.password, user_data.get('password', '')):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     user = User(**user_data)
@@ -288,83 +448,61 @@ async def get_me(current_user: User = Depends(get_current_user)):
 # Timer routes
 @api_router.post("/timer/start")
 async def start_timer(request: TimerStartRequest, current_user: User = Depends(get_current_user)):
-    today = datetime.now(timezone.utc).date().isoformat()
-    
     # Check for existing active timer
-    result = supabase.table('timer_sessions').select('*').eq('user_id', current_user.id).eq('is_active', True).execute()
+    result = await supabase.table('timer_sessions').select('id').eq('user_id', current_user.id).eq('is_active', True).execute()
     if result.data:
         raise HTTPException(status_code=400, detail="Timer already running. Stop current timer first.")
     
-    # Create new timer session
+    # Create new timer session; date and timestamps come from the same instant
     now = datetime.now(timezone.utc)
+    now_iso = now.isoformat()
     timer_data = {
         "user_id": current_user.id,
         "project_id": request.project_id,
         "task_id": request.task_id,
-        "start_time": now.isoformat(),
-        "last_heartbeat": now.isoformat(),
+        "start_time": now_iso,
+        "last_heartbeat": now_iso,
         "is_active": True,
-        "date": today
+        "date": now.date().isoformat()
     }
     
-    result = supabase.table('timer_sessions').insert(timer_data).execute()
+    result = await supabase.table('timer_sessions').insert(timer_data).execute()
+    _stats_cache.clear()
     timer = result.data[0] if result.data else None
     
     return {"success": True, "timer": timer}
 
 @api_router.post("/timer/heartbeat")
-async def timer_heartbeat(current_user: User = Depends(get_current_user)):
-    result = supabase.table('timer_sessions').select('*').eq('user_id', current_user.id).eq('is_active', True).execute()
-    if not result.data:
-        raise HTTPException(status_code=404, detail="No active timer found")
-    
-    timer = result.data[0]
+async def timer_heartbeat(current_user: TokenUser = Depends(get_current_user_light)):
     now = datetime.now(timezone.utc)
     
-    supabase.table('timer_sessions').update({
+    # Conditional update in one round-trip; no row back means no timer is running
+    result = await supabase.table('timer_sessions').update({
         "last_heartbeat": now.isoformat()
-    }).eq('id', timer['id']).execute()
+    }).eq('user_id', current_user.id).eq('is_active', True).execute()
+    if not result.data:
+        raise HTTPException(status_code=404, detail="No active timer found")
     
     return {"success": True, "last_heartbeat": now}
 
 @api_router.post("/timer/stop")
 async def stop_timer(request: TimerStopRequest, current_user: User = Depends(get_current_user)):
-    result = supabase.table('timer_sessions').select('*').eq('user_id', current_user.id).eq('is_active', True).execute()
+    # Deactivate the running timer and log its time entry in one transaction
+    # (stop_timer_session): concurrent stops log the session once, and a failed
+    # insert leaves the timer running so the user can retry
+    result = await supabase.rpc('stop_timer_session', {
+        "p_user_id": current_user.id,
+        "p_notes": request.notes
+    }).execute()
     if not result.data:
         raise HTTPException(status_code=404, detail="No active timer found")
+    _stats_cache.clear()
     
-    timer = result.data[0]
-    
-    # Calculate duration
-    start_time = datetime.fromisoformat(timer['start_time'].replace('Z', '+00:00'))
-    end_time = datetime.now(timezone.utc)
-    duration = int((end_time - start_time).total_seconds())
-    
-    # Create time entry
-    time_entry_data = {
-        "user_id": current_user.id,
-        "project_id": timer['project_id'],
-        "task_id": timer['task_id'],
-        "start_time": start_time.isoformat(),
-        "end_time": end_time.isoformat(),
-        "duration": duration,
-        "entry_type": EntryType.TIMER.value,
-        "date": timer['date'],
-        "notes": request.notes
-    }
-    
-    entry_result = supabase.table('time_entries').insert(time_entry_data).execute()
-    
-    # Deactivate timer
-    supabase.table('timer_sessions').update({
-        "is_active": False
-    }).eq('id', timer['id']).execute()
-    
-    return {"success": True, "time_entry": entry_result.data[0] if entry_result.data else None}
+    return {"success": True, "time_entry": result.data[0]}
 
 @api_router.get("/timer/active")
-async def get_active_timer(current_user: User = Depends(get_current_user)):
-    result = supabase.table('timer_sessions').select('*').eq('user_id', current_user.id).eq('is_active', True).execute()
+async def get_active_timer(current_user: TokenUser = Depends(get_current_user_light)):
+    result = await supabase.table('timer_sessions').select('*').eq('user_id', current_user.id).eq('is_active', True).execute()
     if not result.data:
         return {"active": False, "timer": None}
     
@@ -377,9 +515,11 @@ async def get_time_entries(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     user_id: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    query = supabase.table('time_entries').select('*')
+    query = supabase.table('time_entries').select(TIME_ENTRY_COLUMNS)
     
     # Admins can see all entries, employees only their own
     if current_user.role == UserRole.EMPLOYEE:
@@ -394,8 +534,30 @@ async def get_time_entries(
     elif end_date:
         query = query.lte('date', end_date)
     
-    result = query.order('start_time', desc=True).limit(1000).execute()
-    return result.data
+    # Keyset pagination: continue strictly after the previous page's last (date, start_time, id);
+    # id breaks ties between entries that share a start time
+    if cursor:
+        try:
+            cursor_date, cursor_start, cursor_id = cursor.split('|', 2)
+            cursor_date = date.fromisoformat(cursor_date).isoformat()
+            cursor_start = datetime.fromisoformat(cursor_start).isoformat()
+            cursor_id = str(uuid.UUID(cursor_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.or_(
+            f'date.lt.{cursor_date},'
+            f'and(date.eq.{cursor_date},start_time.lt."{cursor_start}"),'
+            f'and(date.eq.{cursor_date},start_time.eq."{cursor_start}",id.lt.{cursor_id})'
+        )
+    
+    # Newest first; (date, start_time) ordering is served by idx_time_entries_user_date_start
+    result = await query.order('date', desc=True).order('start_time', desc=True).order('id', desc=True).limit(limit).execute()
+    
+    headers = {}
+    if len(result.data) == limit:
+        last = result.data[-1]
+        headers["X-Next-Cursor"] = f"{last['date']}|{last['start_time']}|{last['id']}"
+    return Response(content=serialize_list(TimeEntryList, result.data), media_type="application/json", headers=headers)
 
 @api_router.post("/time-entries/manual", response_model=TimeEntry)
 async def create_manual_entry(entry: TimeEntryCreate, current_user: User = Depends(get_current_user)):
@@ -420,12 +582,12 @@ async def create_manual_entry(entry: TimeEntryCreate, current_user: User = Depen
         "notes": entry.notes
     }
     
-    result = supabase.table('time_entries').insert(time_entry_data).execute()
+    result = await supabase.table('time_entries').insert(time_entry_data).execute()
     return result.data[0] if result.data else None
 
 @api_router.delete("/time-entries/{entry_id}")
 async def delete_time_entry(entry_id: str, current_user: User = Depends(get_current_user)):
-    result = supabase.table('time_entries').select('*').eq('id', entry_id).execute()
+    result = await supabase.table('time_entries').select('id, user_id').eq('id', entry_id).execute()
     if not result.data:
         raise HTTPException(status_code=404, detail="Entry not found")
     
@@ -435,24 +597,28 @@ async def delete_time_entry(entry_id: str, current_user: User = Depends(get_curr
     if entry['user_id'] != current_user.id and current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    supabase.table('time_entries').delete().eq('id', entry_id).execute()
+    await supabase.table('time_entries').delete().eq('id', entry_id).execute()
     return {"success": True}
 
 # Timesheets routes
 @api_router.post("/timesheets/submit")
 async def submit_timesheet(request: TimesheetSubmit, current_user: User = Depends(get_current_user)):
     # Check if already submitted
-    result = supabase.table('timesheets').select('*').eq('user_id', current_user.id).eq('week_start', request.week_start).eq('week_end', request.week_end).execute()
+    result = await supabase.table('timesheets').select('id, status').eq('user_id', current_user.id).eq('week_start', request.week_start).eq('week_end', request.week_end).execute()
     
     existing = result.data[0] if result.data else None
     
-    if existing and existing.get('status') in [TimesheetStatus.SUBMITTED.value, TimesheetStatus.APPROVED.value]:
+    if existing and existing.get('status') in LOCKED_TIMESHEET_STATUSES:
         raise HTTPException(status_code=400, detail="Timesheet already submitted for this period")
     
-    # Calculate total hours
-    entries_result = supabase.table('time_entries').select('*').eq('user_id', current_user.id).gte('date', request.week_start).lte('date', request.week_end).execute()
+    # Calculate total hours (summed in Postgres)
+    total_result = await supabase.rpc('week_total_seconds', {
+        "p_user_id": current_user.id,
+        "p_week_start": request.week_start,
+        "p_week_end": request.week_end
+    }).execute()
     
-    total_seconds = sum(entry.get('duration', 0) for entry in entries_result.data)
+    total_seconds = total_result.data or 0
     total_hours = round(total_seconds / 3600, 2)
     
     now = datetime.now(timezone.utc)
@@ -461,10 +627,10 @@ async def submit_timesheet(request: TimesheetSubmit, current_user: User = Depend
         # Update existing
         update_data = {
             "total_hours": total_hours,
-            "status": TimesheetStatus.SUBMITTED.value,
+            "status": STATUS_SUBMITTED,
             "submitted_at": now.isoformat()
         }
-        supabase.table('timesheets').update(update_data).eq('id', existing['id']).execute()
+        await supabase.table('timesheets').update(update_data).eq('id', existing['id']).execute()
         timesheet_id = existing['id']
     else:
         # Create new
@@ -473,23 +639,23 @@ async def submit_timesheet(request: TimesheetSubmit, current_user: User = Depend
             "week_start": request.week_start,
             "week_end": request.week_end,
             "total_hours": total_hours,
-            "status": TimesheetStatus.SUBMITTED.value,
+            "status": STATUS_SUBMITTED,
             "submitted_at": now.isoformat()
         }
         
-        result = supabase.table('timesheets').insert(timesheet_data).execute()
+        result = await supabase.table('timesheets').insert(timesheet_data).execute()
         timesheet_id = result.data[0]['id'] if result.data else None
+    _stats_cache.clear()
     
     # Create notifications for all admins
-    admins_result = supabase.table('users').select('*').eq('role', UserRole.ADMIN.value).execute()
-    for admin in admins_result.data:
-        await create_notification(
-            user_id=admin['id'],
-            notification_type=NotificationType.TIMESHEET_SUBMITTED,
-            title="New Timesheet Submission",
-            message=f"{current_user.name} submitted a timesheet for {request.week_start}",
-            related_timesheet_id=timesheet_id
-        )
+    admins_result = await supabase.table('users').select('id').eq('role', ROLE_ADMIN).execute()
+    await create_notifications(
+        user_ids=[admin['id'] for admin in admins_result.data],
+        notification_type=NotificationType.TIMESHEET_SUBMITTED,
+        title="New Timesheet Submission",
+        message=f"{current_user.name} submitted a timesheet for {request.week_start}",
+        related_timesheet_id=timesheet_id
+    )
     
     return {"success": True, "timesheet_id": timesheet_id}
 
@@ -497,6 +663,8 @@ async def submit_timesheet(request: TimesheetSubmit, current_user: User = Depend
 async def get_timesheets(
     status: Optional[TimesheetStatus] = None,
     user_id: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
     query = supabase.table('timesheets').select('*')
@@ -510,8 +678,17 @@ async def get_timesheets(
     if status:
         query = query.eq('status', status.value)
     
-    result = query.order('created_at', desc=True).limit(1000).execute()
-    return result.data
+    # Keyset pagination: continue strictly after the previous page's last (created_at, id)
+    if cursor:
+        query = query.or_(created_at_cursor_filter(cursor))
+    
+    result = await query.order('created_at', desc=True).order('id', desc=True).limit(limit).execute()
+    
+    headers = {}
+    if len(result.data) == limit:
+        last = result.data[-1]
+        headers["X-Next-Cursor"] = f"{last['created_at']}|{last['id']}"
+    return Response(content=serialize_list(TimesheetList, result.data), media_type="application/json", headers=headers)
 
 @api_router.put("/timesheets/{timesheet_id}/review")
 async def review_timesheet(
@@ -519,7 +696,7 @@ async def review_timesheet(
     review: TimesheetReview,
     admin_user: User = Depends(get_admin_user)
 ):
-    result = supabase.table('timesheets').select('*').eq('id', timesheet_id).execute()
+    result = await supabase.table('timesheets').select('id, user_id, week_start').eq('id', timesheet_id).execute()
     if not result.data:
         raise HTTPException(status_code=404, detail="Timesheet not found")
     
@@ -536,7 +713,8 @@ async def review_timesheet(
         "admin_comment": review.admin_comment
     }
     
-    supabase.table('timesheets').update(update_data).eq('id', timesheet_id).execute()
+    await supabase.table('timesheets').update(update_data).eq('id', timesheet_id).execute()
+    _stats_cache.clear()
     
     # Create notification for the employee
     employee_id = timesheet['user_id']
@@ -563,28 +741,34 @@ async def review_timesheet(
 
 # Admin - Employee Management
 @api_router.get("/admin/employees", response_model=List[User])
-async def get_employees(admin_user: User = Depends(get_admin_user)):
-    result = supabase.table('users').select('id, email, name, role, status, default_project, default_task, created_at').order('created_at', desc=True).execute()
-    return result.data
+async def get_employees(request: Request, admin_user: User = Depends(get_admin_user)):
+    cached = _employees_cache.get('all')
+    if cached is None:
+        result = await supabase.table('users').select(USER_COLUMNS).order('created_at', desc=True).execute()
+        body = serialize_list(UserList, result.data)
+        cached = _employees_cache['all'] = (etag_for(body), body)
+    return cached_json_response(request, *cached)
 
 @api_router.post("/admin/employees", response_model=User)
 async def create_employee(employee: UserCreate, admin_user: User = Depends(get_admin_user)):
     # Check if email exists
-    result = supabase.table('users').select('*').eq('email', employee.email).execute()
+    result = await supabase.table('users').select('id').eq('email', employee.email).execute()
     if result.data:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user_data = {
         "email": employee.email,
         "name": employee.name,
-        "password": hash_password(employee.password),
+        "password": await hash_password(employee.password),
         "role": employee.role.value,
         "status": employee.status.value,
         "default_project": employee.default_project,
         "default_task": employee.default_task
     }
     
-    result = supabase.table('users').insert(user_data).execute()
+    result = await supabase.table('users').insert(user_data).execute()
+    _employees_cache.clear()
+    _stats_cache.clear()
     return result.data[0] if result.data else None
 
 @api_router.put("/admin/employees/{user_id}", response_model=User)
@@ -593,22 +777,29 @@ async def update_employee(
     update: UserUpdate,
     admin_user: User = Depends(get_admin_user)
 ):
-    result = supabase.table('users').select('*').eq('id', user_id).execute()
+    result = await supabase.table('users').select('id').eq('id', user_id).execute()
     if not result.data:
         raise HTTPException(status_code=404, detail="User not found")
     
     update_data = update.model_dump(exclude_unset=True)
     if 'password' in update_data:
-        update_data['password'] = hash_password(update_data['password'])
+        update_data['password'] = await hash_password(update_data['password'])
     
-    result = supabase.table('users').update(update_data).eq('id', user_id).execute()
+    result = await supabase.table('users').update(update_data).eq('id', user_id).execute()
+    invalidate_user_cache(user_id)
+    _employees_cache.clear()
+    _stats_cache.clear()
     return result.data[0] if result.data else None
 
 # Projects Management
 @api_router.get("/projects", response_model=List[Project])
-async def get_projects(current_user: User = Depends(get_current_user)):
-    result = supabase.table('projects').select('*').order('created_at', desc=True).execute()
-    return result.data
+async def get_projects(request: Request, current_user: User = Depends(get_current_user)):
+    cached = _projects_cache.get('all')
+    if cached is None:
+        result = await supabase.table('projects').select('*').order('created_at', desc=True).execute()
+        body = serialize_list(ProjectList, result.data)
+        cached = _projects_cache['all'] = (etag_for(body), body)
+    return cached_json_response(request, *cached)
 
 @api_router.post("/projects", response_model=Project)
 async def create_project(project: ProjectCreate, admin_user: User = Depends(get_admin_user)):
@@ -619,7 +810,9 @@ async def create_project(project: ProjectCreate, admin_user: User = Depends(get_
         "status": "active"
     }
     
-    result = supabase.table('projects').insert(project_data).execute()
+    result = await supabase.table('projects').insert(project_data).execute()
+    _projects_cache.clear()
+    _stats_cache.clear()
     return result.data[0] if result.data else None
 
 @api_router.put("/projects/{project_id}", response_model=Project)
@@ -628,23 +821,28 @@ async def update_project(
     update: ProjectCreate,
     admin_user: User = Depends(get_admin_user)
 ):
-    result = supabase.table('projects').select('*').eq('id', project_id).execute()
+    result = await supabase.table('projects').select('id').eq('id', project_id).execute()
     if not result.data:
         raise HTTPException(status_code=404, detail="Project not found")
     
     update_data = update.model_dump(exclude_unset=True)
-    result = supabase.table('projects').update(update_data).eq('id', project_id).execute()
+    result = await supabase.table('projects').update(update_data).eq('id', project_id).execute()
+    _projects_cache.clear()
     return result.data[0] if result.data else None
 
 # Tasks Management
 @api_router.get("/tasks", response_model=List[Task])
-async def get_tasks(project_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
-    query = supabase.table('tasks').select('*')
-    if project_id:
-        query = query.eq('project_id', project_id)
-    
-    result = query.order('created_at', desc=True).execute()
-    return result.data
+async def get_tasks(request: Request, project_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    cached = _tasks_cache.get(project_id)
+    if cached is None:
+        query = supabase.table('tasks').select('*')
+        if project_id:
+            query = query.eq('project_id', project_id)
+        
+        result = await query.order('created_at', desc=True).execute()
+        body = serialize_list(TaskList, result.data)
+        cached = _tasks_cache[project_id] = (etag_for(body), body)
+    return cached_json_response(request, *cached)
 
 @api_router.post("/tasks", response_model=Task)
 async def create_task(task: TaskCreate, admin_user: User = Depends(get_admin_user)):
@@ -655,7 +853,8 @@ async def create_task(task: TaskCreate, admin_user: User = Depends(get_admin_use
         "status": "active"
     }
     
-    result = supabase.table('tasks').insert(task_data).execute()
+    result = await supabase.table('tasks').insert(task_data).execute()
+    _tasks_cache.clear()
     return result.data[0] if result.data else None
 
 @api_router.put("/tasks/{task_id}", response_model=Task)
@@ -664,12 +863,13 @@ async def update_task(
     update: TaskCreate,
     admin_user: User = Depends(get_admin_user)
 ):
-    result = supabase.table('tasks').select('*').eq('id', task_id).execute()
+    result = await supabase.table('tasks').select('id').eq('id', task_id).execute()
     if not result.data:
         raise HTTPException(status_code=404, detail="Task not found")
     
     update_data = update.model_dump(exclude_unset=True)
-    result = supabase.table('tasks').update(update_data).eq('id', task_id).execute()
+    result = await supabase.table('tasks').update(update_data).eq('id', task_id).execute()
+    _tasks_cache.clear()
     return result.data[0] if result.data else None
 
 # Reports
@@ -682,131 +882,77 @@ async def get_time_report(
     project_id: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    # Build query
-    query = supabase.table('time_entries').select('*').gte('date', start_date).lte('date', end_date)
-    
+    # Employees can only report on their own entries
     if current_user.role == UserRole.EMPLOYEE:
-        query = query.eq('user_id', current_user.id)
-    elif user_id:
-        query = query.eq('user_id', user_id)
-    
-    if project_id:
-        query = query.eq('project_id', project_id)
-    
-    # Get entries
-    entries_result = query.execute()
-    entries = entries_result.data
-    
-    # Get related data
-    users_result = supabase.table('users').select('*').execute()
-    users = {u['id']: u for u in users_result.data}
-    
-    projects_result = supabase.table('projects').select('*').execute()
-    projects = {p['id']: p for p in projects_result.data}
-    
-    tasks_result = supabase.table('tasks').select('*').execute()
-    tasks = {t['id']: t for t in tasks_result.data}
-    
-    # Group data
-    grouped = {}
-    for entry in entries:
-        key = None
-        if group_by == "user":
-            key = entry['user_id']
-            label = users.get(key, {}).get('name', 'Unknown')
-        elif group_by == "project":
-            key = entry['project_id']
-            label = projects.get(key, {}).get('name', 'Unknown')
-        elif group_by == "task":
-            key = entry['task_id']
-            label = tasks.get(key, {}).get('name', 'Unknown')
-        elif group_by == "date":
-            key = entry['date']
-            label = entry['date']
-        else:
-            key = "all"
-            label = "All"
-        
-        if key not in grouped:
-            grouped[key] = {
-                "id": key,
-                "label": label,
-                "total_seconds": 0,
-                "total_hours": 0,
-                "entry_count": 0
-            }
-        
-        grouped[key]['total_seconds'] += entry.get('duration', 0)
-        grouped[key]['entry_count'] += 1
-    
-    # Calculate hours
-    for item in grouped.values():
-        item['total_hours'] = round(item['total_seconds'] / 3600, 2)
+        user_id = current_user.id
+    
+    # Join and aggregate in Postgres
+    result = await supabase.rpc('time_report_grouped', {
+        "p_start_date": start_date,
+        "p_end_date": end_date,
+        "p_group_by": group_by,
+        "p_user_id": user_id,
+        "p_project_id": project_id
+    }).execute()
+    
+    grouped = [
+        {
+            "id": row['id'],
+            "label": row['label'],
+            "total_seconds": row['total_seconds'],
+            "total_hours": round(row['total_seconds'] / 3600, 2),
+            "entry_count": row['entry_count']
+        }
+        for row in result.data
+    ]
+    total_seconds = sum(g['total_seconds'] for g in grouped)
     
     return {
-        "data": list(grouped.values()),
+        "data": grouped,
         "summary": {
-            "total_seconds": sum(g['total_seconds'] for g in grouped.values()),
-            "total_hours": round(sum(g['total_seconds'] for g in grouped.values()) / 3600, 2),
-            "total_entries": sum(g['entry_count'] for g in grouped.values())
+            "total_seconds": total_seconds,
+            "total_hours": round(total_seconds / 3600, 2),
+            "total_entries": sum(g['entry_count'] for g in grouped)
         }
     }
 
-@api_router.get("/reports/export/pdf")
-async def export_pdf(
-    start_date: str,
-    end_date: str,
-    user_id: Optional[str] = None,
-    current_user: User = Depends(get_current_user)
-):
-    # Build query
-    query = supabase.table('time_entries').select('*').gte('date', start_date).lte('date', end_date)
-    
-    if current_user.role == UserRole.EMPLOYEE:
-        query = query.eq('user_id', current_user.id)
-    elif user_id:
-        query = query.eq('user_id', user_id)
-    
-    # Get entries
-    entries_result = query.execute()
-    entries = entries_result.data
-    
-    # Get related data
-    users_result = supabase.table('users').select('*').execute()
-    users = {u['id']: u for u in users_result.data}
-    
-    projects_result = supabase.table('projects').select('*').execute()
-    projects = {p['id']: p for p in projects_result.data}
-    
-    tasks_result = supabase.table('tasks').select('*').execute()
-    tasks = {t['id']: t for t in tasks_result.data}
-    
-    # Create PDF
+# PDF report styling, built once and shared (read-only) by every export
+REPORT_STYLES = getSampleStyleSheet()
+REPORT_TABLE_HEADER = ('Date', 'Employee', 'Project', 'Task', 'Duration (hrs)')
+REPORT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, -1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+def render_time_report_pdf(start_date: str, end_date: str, entries: List[Dict[str, Any]]) -> io.BytesIO:
+    """Render the time report PDF. CPU-bound, so callers run it in a worker thread"""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
     elements = []
-    styles = getSampleStyleSheet()
     
     # Title
-    title = Paragraph(f"Time Report ({start_date} to {end_date})", styles['Title'])
+    title = Paragraph(f"Time Report ({start_date} to {end_date})", REPORT_STYLES['Title'])
     elements.append(title)
     elements.append(Spacer(1, 0.3*inch))
     
     # Table data
-    data = [['Date', 'Employee', 'Project', 'Task', 'Duration (hrs)']]
+    data = [REPORT_TABLE_HEADER]
     total_seconds = 0
     
     for entry in entries:
-        user_name = users.get(entry['user_id'], {}).get('name', 'Unknown')
-        project_name = projects.get(entry['project_id'], {}).get('name', 'Unknown')
-        task_name = tasks.get(entry['task_id'], {}).get('name', 'Unknown')
         hours = round(entry.get('duration', 0) / 3600, 2)
         
         data.append([
             entry['date'],
-            user_name,
-            project_name,
-            task_name,
+            entry['user_name'],
+            entry['project_name'],
+            entry['task_name'],
             str(hours)
         ])
         total_seconds += entry.get('duration', 0)
@@ -814,29 +960,87 @@ async def export_pdf(
     # Add total
     data.append(['', '', '', 'Total', str(round(total_seconds / 3600, 2))])
     
-    # Create table
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    # LongTable lays out many rows faster and repeats the header row on every page
+    table = LongTable(data, repeatRows=1)
+    table.setStyle(REPORT_TABLE_STYLE)
     
     elements.append(table)
     doc.build(elements)
     
     buffer.seek(0)
+    return buffer
+
+def time_report_export_query(current_user: User, start_date: str, end_date: str, user_id: Optional[str]):
+    """Export rows, labelled with names by the time_entries_enriched view, in a stable order"""
+    query = supabase.table('time_entries_enriched').select('date, duration, user_name, project_name, task_name').gte('date', start_date).lte('date', end_date)
+    
+    if current_user.role == UserRole.EMPLOYEE:
+        query = query.eq('user_id', current_user.id)
+    elif user_id:
+        query = query.eq('user_id', user_id)
+    
+    return query.order('date').order('start_time').order('id')
+
+# Rows fetched from the view per request by the exports
+EXPORT_PAGE_ROWS = 1000
+
+async def iter_time_report_pages(current_user: User, start_date: str, end_date: str, user_id: Optional[str]):
+    """Yield the export rows in pages of EXPORT_PAGE_ROWS, so no single response hits PostgREST's row cap"""
+    offset = 0
+    while True:
+        page = await time_report_export_query(current_user, start_date, end_date, user_id).range(offset, offset + EXPORT_PAGE_ROWS - 1).execute()
+        if page.data:
+            yield page.data
+        # A short page is the last one
+        if len(page.data) < EXPORT_PAGE_ROWS:
+            break
+        offset += EXPORT_PAGE_ROWS
+
+@api_router.get("/reports/export/pdf")
+async def export_pdf(
+    start_date: str,
+    end_date: str,
+    user_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    # The PDF lays out the whole table at once, so gather every page first
+    entries = []
+    async for page in iter_time_report_pages(current_user, start_date, end_date, user_id):
+        entries.extend(page)
+    
+    # Create PDF off the event loop
+    buffer = await asyncio.to_thread(render_time_report_pdf, start_date, end_date, entries)
+    
     return StreamingResponse(
         buffer,
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename=time_report_{start_date}_{end_date}.pdf"}
     )
 
+async def iter_time_report_csv(current_user: User, start_date: str, end_date: str, user_id: Optional[str]):
+    """Yield the CSV export one page of rows at a time, reusing one small buffer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(['Date', 'Employee', 'Project', 'Task', 'Duration (hours)'])
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    
+    async for page in iter_time_report_pages(current_user, start_date, end_date, user_id):
+        writer.writerows(
+            [
+                entry['date'],
+                entry['user_name'],
+                entry['project_name'],
+                entry['task_name'],
+                round(entry.get('duration', 0) / 3600, 2)
+            ]
+            for entry in page
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
 @api_router.get("/reports/export/csv")
 async def export_csv(
     start_date: str,
@@ -844,41 +1048,8 @@ async def export_csv(
     user_id: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    # Build query
-    query = supabase.table('time_entries').select('*').gte('date', start_date).lte('date', end_date)
-    
-    if current_user.role == UserRole.EMPLOYEE:
-        query = query.eq('user_id', current_user.id)
-    elif user_id:
-        query = query.eq('user_id', user_id)
-    
-    # Get entries
-    entries_result = query.execute()
-    entries = entries_result.data
-    
-    # Get related data
-    users_result = supabase.table('users').select('*').execute()
-    users = {u['id']: u for u in users_result.data}
-    
-    projects_result = supabase.table('projects').select('*').execute()
-    projects = {p['id']: p for p in projects_result.data}
-    
-    tasks_result = supabase.table('tasks').select('*').execute()
-    tasks = {t['id']: t for t in tasks_result.data}
-    
-    # Build CSV
-    csv_data = "Date,Employee,Project,Task,Duration (hours)\n"
-    
-    for entry in entries:
-        user_name = users.get(entry['user_id'], {}).get('name', 'Unknown')
-        project_name = projects.get(entry['project_id'], {}).get('name', 'Unknown')
-        task_name = tasks.get(entry['task_id'], {}).get('name', 'Unknown')
-        hours = round(entry.get('duration', 0) / 3600, 2)
-        
-        csv_data += f"{entry['date']},{user_name},{project_name},{task_name},{hours}\n"
-    
     return StreamingResponse(
-        iter([csv_data]),
+        iter_time_report_csv(current_user, start_date, end_date, user_id),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename=time_report_{start_date}_{end_date}.csv"}
     )
@@ -887,63 +1058,63 @@ async def export_csv(
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
     if current_user.role == UserRole.ADMIN:
-        # Admin stats
-        total_employees_result = supabase.table('users').select('id', count='exact').eq('role', UserRole.EMPLOYEE.value).execute()
-        total_employees = total_employees_result.count or 0
-        
-        active_employees_result = supabase.table('users').select('id', count='exact').eq('role', UserRole.EMPLOYEE.value).eq('status', UserStatus.ACTIVE.value).execute()
-        active_employees = active_employees_result.count or 0
-        
-        pending_timesheets_result = supabase.table('timesheets').select('id', count='exact').eq('status', TimesheetStatus.SUBMITTED.value).execute()
-        pending_timesheets = pending_timesheets_result.count or 0
-        
-        total_projects_result = supabase.table('projects').select('id', count='exact').execute()
-        total_projects = total_projects_result.count or 0
-        
-        # Active timers
-        active_timers_result = supabase.table('timer_sessions').select('id', count='exact').eq('is_active', True).execute()
-        active_timers = active_timers_result.count or 0
-        
-        return {
-            "total_employees": total_employees,
-            "active_employees": active_employees,
-            "pending_timesheets": pending_timesheets,
-            "total_projects": total_projects,
-            "active_timers": active_timers
-        }
+        # Admin stats, counted in one round trip by the dashboard_stats function
+        stats = _stats_cache.get('admin')
+        if stats is None:
+            result = await supabase.rpc('dashboard_stats').execute()
+            stats = _stats_cache['admin'] = result.data
+        return stats
     else:
         # Employee stats
-        today = datetime.now(timezone.utc).date().isoformat()
-        week_start = (datetime.now(timezone.utc).date() - timedelta(days=datetime.now(timezone.utc).weekday())).isoformat()
+        # Read the clock once so today and week start always agree, even at midnight
+        now_date = datetime.now(timezone.utc).date()
+        today = now_date.isoformat()
+        week_start = (now_date - timedelta(days=now_date.weekday())).isoformat()
         
-        today_entries_result = supabase.table('time_entries').select('duration').eq('user_id', current_user.id).eq('date', today).execute()
-        today_seconds = sum(e.get('duration', 0) for e in today_entries_result.data)
-        
-        week_entries_result = supabase.table('time_entries').select('duration').eq('user_id', current_user.id).gte('date', week_start).execute()
-        week_seconds = sum(e.get('duration', 0) for e in week_entries_result.data)
+        # Summed in Postgres over the user's entries since week start
+        result = await supabase.rpc('employee_hours', {
+            "p_user_id": current_user.id,
+            "p_week_start": week_start,
+            "p_today": today
+        }).execute()
+        hours = result.data
         
         return {
-            "today_hours": round(today_seconds / 3600, 2),
-            "week_hours": round(week_seconds / 3600, 2),
-            "total_entries": len(week_entries_result.data)
+            "today_hours": round(hours['today_seconds'] / 3600, 2),
+            "week_hours": round(hours['week_seconds'] / 3600, 2),
+            "total_entries": hours['total_entries']
         }
 
 
 # Notification routes
 @api_router.get("/notifications", response_model=List[Notification])
 async def get_notifications(
-    limit: int = 50,
-    current_user: User = Depends(get_current_user)
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: TokenUser = Depends(get_current_user_light)
 ):
     """Get user's notifications"""
-    result = supabase.table('notifications').select('*').eq('user_id', current_user.id).order('created_at', desc=True).limit(limit).execute()
-    return result.data
+    query = supabase.table('notifications').select(NOTIFICATION_COLUMNS).eq('user_id', current_user.id)
+    
+    # Keyset pagination: continue strictly after the previous page's last (created_at, id)
+    if cursor:
+        query = query.or_(created_at_cursor_filter(cursor))
+    
+    # Newest first, off idx_notifications_user_created
+    result = await query.order('created_at', desc=True).order('id', desc=True).limit(limit).execute()
+    
+    headers = {}
+    if len(result.data) == limit:
+        last = result.data[-1]
+        headers["X-Next-Cursor"] = f"{last['created_at']}|{last['id']}"
+    return Response(content=serialize_list(NotificationList, result.data), media_type="application/json", headers=headers)
 
 @api_router.get("/notifications/unread-count")
-async def get_unread_count(current_user: User = Depends(get_current_user)):
+async def get_unread_count(current_user: TokenUser = Depends(get_current_user_light)):
     """Get count of unread notifications"""
-    result = supabase.table('notifications').select('id', count='exact').eq('user_id', current_user.id).eq('read', False).execute()
-    return {"count": result.count or 0}
+    # Kept current by triggers on notifications, so this is a primary key read rather than a COUNT
+    result = await supabase.table('users').select('unread_notifications').eq('id', current_user.id).execute()
+    return {"count": result.data[0]['unread_notifications'] if result.data else 0}
 
 @api_router.put("/notifications/{notification_id}/read")
 async def mark_notification_read(
@@ -951,19 +1122,19 @@ async def mark_notification_read(
     current_user: User = Depends(get_current_user)
 ):
     """Mark a notification as read"""
-    result = supabase.table('notifications').select('*').eq('id', notification_id).eq('user_id', current_user.id).execute()
+    # Ownership check and update in one statement; no row back means not found (or not ours)
+    result = await supabase.table('notifications').update({"read": True}).eq('id', notification_id).eq('user_id', current_user.id).execute()
     
     if not result.data:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    supabase.table('notifications').update({"read": True}).eq('id', notification_id).execute()
-    
     return {"success": True}
 
 @api_router.put("/notifications/mark-all-read")
 async def mark_all_notifications_read(current_user: User = Depends(get_current_user)):
     """Mark all user's notifications as read"""
-    supabase.table('notifications').update({"read": True}).eq('user_id', current_user.id).eq('read', False).execute()
+    # Nothing is read back, so skip returning the updated rows
+    await supabase.table('notifications').update({"read": True}, returning=ReturnMethod.minimal).eq('user_id', current_user.id).eq('read', False).execute()
     
     return {"success": True}
 
@@ -978,8 +1149,13 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Compression: gzip bodies over 1 KiB for clients that accept it; streamed exports are compressed chunk by chunk.
+# The ETag is left unchanged on the gzipped body, which is why etag_for issues weak validators
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Logging
 logging.basicConfig(
     level=logging.INFO,
@@ -989,8 +1165,18 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_event():
+    global supabase
+    # The one client for the process; handlers only ever use this module global
+    supabase = await SupabaseClient.create(
+        supabase_url,
+        supabase_key,
+        options=AsyncClientOptions(postgrest_client_timeout=POSTGREST_TIMEOUT_SECONDS)
+    )
+    # Load passlib's bcrypt backend now rather than on the first employee creation
+    await hash_password("warmup")
     logger.info("Omni Gratum Time Tracking System started with Supabase")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await supabase.postgrest.aclose()
     logger.info("Shutting down Omni Gratum Time Tracking System")
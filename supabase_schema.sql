@@ -102,23 +102,222 @@ CREATE INDEX idx_projects_status ON projects(status);
 CREATE INDEX idx_tasks_project_id ON tasks(project_id);
 CREATE INDEX idx_tasks_status ON tasks(status);
 
-CREATE INDEX idx_time_entries_user_id ON time_entries(user_id);
 CREATE INDEX idx_time_entries_project_id ON time_entries(project_id);
 CREATE INDEX idx_time_entries_task_id ON time_entries(task_id);
 CREATE INDEX idx_time_entries_date ON time_entries(date);
-CREATE INDEX idx_time_entries_user_date ON time_entries(user_id, date);
 
 CREATE INDEX idx_timer_sessions_user_id ON timer_sessions(user_id);
 CREATE INDEX idx_timer_sessions_is_active ON timer_sessions(is_active);
-CREATE INDEX idx_timer_sessions_user_active ON timer_sessions(user_id, is_active);
 
-CREATE INDEX idx_timesheets_user_id ON timesheets(user_id);
 CREATE INDEX idx_timesheets_status ON timesheets(status);
 CREATE INDEX idx_timesheets_week ON timesheets(week_start, week_end);
 
-CREATE INDEX idx_notifications_user_id ON notifications(user_id);
 CREATE INDEX idx_notifications_read ON notifications(read);
-CREATE INDEX idx_notifications_user_read ON notifications(user_id, read);
+
+-- Indexes matching the API's hot queries
+-- (IF [NOT] EXISTS, so this section can be re-run on an existing database)
+
+-- GET /time-entries: filter by user (and date range), newest first
+CREATE INDEX IF NOT EXISTS idx_time_entries_user_date_start ON time_entries(user_id, date DESC, start_time DESC);
+
+-- Active timer lookups (start, heartbeat, stop, active): only running sessions are indexed
+CREATE INDEX IF NOT EXISTS idx_timer_sessions_user_running ON timer_sessions(user_id) WHERE is_active;
+
+-- Timesheet submission: a user's existing timesheet for a given week
+CREATE INDEX IF NOT EXISTS idx_timesheets_user_week ON timesheets(user_id, week_start, week_end);
+
+-- Notification list and unread filters, newest first
+CREATE INDEX IF NOT EXISTS idx_notifications_user_read_created ON notifications(user_id, read, created_at DESC);
+
+-- GET /notifications: a user's notifications newest first, read straight off the index in order
+CREATE INDEX IF NOT EXISTS idx_notifications_user_created ON notifications(user_id, created_at DESC);
+
+-- Admin dashboard employee counts (total and active); running timers are counted from idx_timer_sessions_user_running
+CREATE INDEX IF NOT EXISTS idx_users_employee_status ON users(status) WHERE role = 'employee';
+
+-- Superseded by the indexes above, which start with the same columns
+DROP INDEX IF EXISTS idx_time_entries_user_id;
+DROP INDEX IF EXISTS idx_time_entries_user_date;
+DROP INDEX IF EXISTS idx_timer_sessions_user_active;
+DROP INDEX IF EXISTS idx_timesheets_user_id;
+DROP INDEX IF EXISTS idx_notifications_user_read;
+DROP INDEX IF EXISTS idx_notifications_user_id;
+
+-- Views read by the API
+-- (CREATE OR REPLACE, so this section can be re-run on an existing database)
+
+-- Time entries labelled with user, project and task names (reports and exports);
+-- an entry whose user, project or task cannot be found is kept and labelled 'Unknown'
+CREATE OR REPLACE VIEW time_entries_enriched AS
+SELECT
+    te.*,
+    COALESCE(u.name, 'Unknown')::VARCHAR(255) AS user_name,
+    COALESCE(p.name, 'Unknown')::VARCHAR(255) AS project_name,
+    COALESCE(t.name, 'Unknown')::VARCHAR(255) AS task_name
+FROM time_entries te
+LEFT JOIN users u ON u.id = te.user_id
+LEFT JOIN projects p ON p.id = te.project_id
+LEFT JOIN tasks t ON t.id = te.task_id;
+
+-- Functions called by the API through supabase.rpc()
+-- (CREATE OR REPLACE, so this section can be re-run on an existing database)
+
+-- Total tracked seconds for one user over a date range (timesheet submission)
+CREATE OR REPLACE FUNCTION week_total_seconds(p_user_id UUID, p_week_start DATE, p_week_end DATE)
+RETURNS BIGINT
+LANGUAGE sql STABLE
+AS $$
+    SELECT COALESCE(SUM(duration), 0)
+    FROM time_entries
+    WHERE user_id = p_user_id AND date >= p_week_start AND date <= p_week_end;
+$$;
+
+-- Report totals grouped by user, project, task or date (anything else: one "All" row)
+CREATE OR REPLACE FUNCTION time_report_grouped(
+    p_start_date DATE,
+    p_end_date DATE,
+    p_group_by TEXT,
+    p_user_id UUID DEFAULT NULL,
+    p_project_id UUID DEFAULT NULL
+)
+RETURNS TABLE (id TEXT, label TEXT, total_seconds BIGINT, entry_count BIGINT)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        CASE p_group_by
+            WHEN 'user' THEN te.user_id::TEXT
+            WHEN 'project' THEN te.project_id::TEXT
+            WHEN 'task' THEN te.task_id::TEXT
+            WHEN 'date' THEN te.date::TEXT
+            ELSE 'all'
+        END,
+        CASE p_group_by
+            WHEN 'user' THEN te.user_name
+            WHEN 'project' THEN te.project_name
+            WHEN 'task' THEN te.task_name
+            WHEN 'date' THEN te.date::TEXT
+            ELSE 'All'
+        END,
+        SUM(te.duration),
+        COUNT(*)
+    FROM time_entries_enriched te
+    WHERE te.date >= p_start_date AND te.date <= p_end_date
+      AND (p_user_id IS NULL OR te.user_id = p_user_id)
+      AND (p_project_id IS NULL OR te.project_id = p_project_id)
+    GROUP BY 1, 2;
+$$;
+
+-- Admin dashboard counters, as one JSON object
+CREATE OR REPLACE FUNCTION dashboard_stats()
+RETURNS JSON
+LANGUAGE sql STABLE
+AS $$
+    SELECT json_build_object(
+        'total_employees', (SELECT COUNT(*) FROM users WHERE role = 'employee'),
+        'active_employees', (SELECT COUNT(*) FROM users WHERE role = 'employee' AND status = 'active'),
+        'pending_timesheets', (SELECT COUNT(*) FROM timesheets WHERE status = 'submitted'),
+        'total_projects', (SELECT COUNT(*) FROM projects),
+        'active_timers', (SELECT COUNT(*) FROM timer_sessions WHERE is_active)
+    );
+$$;
+
+-- Employee dashboard: seconds tracked today and this week, and this week's entry count
+CREATE OR REPLACE FUNCTION employee_hours(p_user_id UUID, p_week_start DATE, p_today DATE)
+RETURNS JSON
+LANGUAGE sql STABLE
+AS $$
+    SELECT json_build_object(
+        'today_seconds', COALESCE(SUM(duration) FILTER (WHERE date = p_today), 0),
+        'week_seconds', COALESCE(SUM(duration), 0),
+        'total_entries', COUNT(*)
+    )
+    FROM time_entries
+    WHERE user_id = p_user_id AND date >= p_week_start;
+$$;
+
+-- POST /timer/stop: close the user's running timer and log it as a time entry in one
+-- transaction, so a failed insert leaves the timer running and concurrent stops log it once
+CREATE OR REPLACE FUNCTION stop_timer_session(p_user_id UUID, p_notes TEXT DEFAULT NULL)
+RETURNS SETOF time_entries
+LANGUAGE sql
+AS $$
+    WITH stopped AS (
+        UPDATE timer_sessions
+        SET is_active = FALSE
+        WHERE user_id = p_user_id AND is_active
+        RETURNING project_id, task_id, start_time, date
+    )
+    INSERT INTO time_entries (user_id, project_id, task_id, start_time, end_time, duration, entry_type, date, notes)
+    SELECT p_user_id, project_id, task_id, start_time, NOW(),
+           FLOOR(EXTRACT(EPOCH FROM NOW() - start_time))::INTEGER, 'timer', date, p_notes
+    FROM stopped
+    RETURNING *;
+$$;
+
+-- Denormalised counters kept up to date by triggers
+-- (re-runnable: the column is added once and the counts are recomputed)
+
+-- Unread notifications per user, read by GET /notifications/unread-count
+ALTER TABLE users ADD COLUMN IF NOT EXISTS unread_notifications INTEGER NOT NULL DEFAULT 0;
+
+UPDATE users u SET unread_notifications = (
+    SELECT COUNT(*) FROM notifications n WHERE n.user_id = u.id AND NOT n.read
+);
+
+-- Statement-level, so a bulk change (e.g. mark all read) applies one aggregated
+-- delta per user instead of touching the same users row once per notification
+CREATE OR REPLACE FUNCTION maintain_unread_notifications()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE users u SET unread_notifications = u.unread_notifications + d.delta
+        FROM (
+            SELECT user_id, COUNT(*) AS delta FROM new_rows WHERE NOT read GROUP BY user_id
+        ) d
+        WHERE u.id = d.user_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE users u SET unread_notifications = u.unread_notifications - d.delta
+        FROM (
+            SELECT user_id, COUNT(*) AS delta FROM old_rows WHERE NOT read GROUP BY user_id
+        ) d
+        WHERE u.id = d.user_id;
+    ELSE
+        UPDATE users u SET unread_notifications = u.unread_notifications + d.delta
+        FROM (
+            SELECT user_id, SUM(delta) AS delta
+            FROM (
+                SELECT user_id, 1 AS delta FROM new_rows WHERE NOT read
+                UNION ALL
+                SELECT user_id, -1 AS delta FROM old_rows WHERE NOT read
+            ) changes
+            GROUP BY user_id
+            HAVING SUM(delta) <> 0
+        ) d
+        WHERE u.id = d.user_id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS notifications_unread_count_insert ON notifications;
+CREATE TRIGGER notifications_unread_count_insert
+AFTER INSERT ON notifications
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION maintain_unread_notifications();
+
+DROP TRIGGER IF EXISTS notifications_unread_count_update ON notifications;
+CREATE TRIGGER notifications_unread_count_update
+AFTER UPDATE ON notifications
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION maintain_unread_notifications();
+
+DROP TRIGGER IF EXISTS notifications_unread_count_delete ON notifications;
+CREATE TRIGGER notifications_unread_count_delete
+AFTER DELETE ON notifications
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION maintain_unread_notifications();
 
 -- Enable Row Level Security (RLS) - Optional but recommended for Supabase
 -- You can configure RLS policies in Supabase dashboard if needed